@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import environ
 import os
+import tempfile
 from pathlib import Path
 from corsheaders.defaults import default_headers
 
@@ -40,6 +41,9 @@ SECRET_KEY = env('SECRET_KEY')
 DEBUG = env.bool('DEBUG')
 GEMINI_API_KEY = env('GEMINI_API_KEY')
 
+# load google.generativeai and PyMuPDF in the WSGI parent before workers fork
+PRELOAD_AI_PROVIDERS = env.bool('PRELOAD_AI_PROVIDERS', default=False)
+
 ALLOWED_HOSTS = []
 
 
@@ -68,6 +72,9 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 REST_FRAMEWORK = {
+    # reverse proxies in front of the app; 0 means client IPs come from REMOTE_ADDR and
+    # X-Forwarded-For (which clients can forge) is ignored by throttling
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
@@ -78,13 +85,52 @@ REST_FRAMEWORK = {
 
 MAX_DAILY_GENERATIONS = 5 # adjust lang
 
+# token budgets, checked against local estimates before calling the model
+GENERATION_MAX_INPUT_TOKENS = 30000  # per model call; longer notes are chunked or truncated
+GENERATION_REQUEST_TOKEN_BUDGET = 120000  # per generate request, across all chunks
+GENERATION_DAILY_TOKEN_BUDGET = 500000  # per user per day, input + output
+
+# chars per token for notes.tokens.estimate_tokens, per model name
+TOKEN_ESTIMATOR_CALIBRATION = {
+    'models/gemini-1.5-flash': {'chars_per_token': 4.0, 'non_ascii_chars_per_token': 1.5},
+    'gemini-2.0-flash': {'chars_per_token': 4.0, 'non_ascii_chars_per_token': 1.5},
+}
+
+EXPORT_CHUNK_SIZE = 500  # rows fetched per round trip when streaming exports
+
+# unauthenticated test-ai endpoint, see notes/throttling.py
+TEST_AI_MAX_BODY_BYTES = 64 * 1024
+TEST_AI_MAX_TEXT_CHARS = 20000
+TEST_AI_IP_RATE = (10, 60)  # requests per window in seconds, per client IP
+TEST_AI_FINGERPRINT_RATE = (30, 3600)  # identical inputs, from any IP
+TEST_AI_RESPONSE_CACHE_SECONDS = 60 * 60
+TEST_AI_SHARED_LIMITS = env.bool('TEST_AI_SHARED_LIMITS', default=False)  # keep limits in CACHES, shared by workers
+WEB_CONCURRENCY = env.int('WEB_CONCURRENCY', default=4)  # worker processes
+WEB_THREADS = env.int('WEB_THREADS', default=1)  # threads per worker process
+TEST_AI_WORKER_SHARE = 0.25  # most of the request threads test-ai may occupy at once
+# held across all workers via lock files, or the cache with TEST_AI_SHARED_LIMITS; at least one
+TEST_AI_MAX_CONCURRENT = max(1, int(WEB_CONCURRENCY * WEB_THREADS * TEST_AI_WORKER_SHARE))
+TEST_AI_LOCK_DIR = env('TEST_AI_LOCK_DIR', default=os.path.join(tempfile.gettempdir(), 'cognify_ai-locks'))
+TEST_AI_CALL_LEASE_SECONDS = 300  # a shared pool slot is freed after this if its worker dies mid-call
+
 MAX_FILE_SIZE_MB = 10  # 10MB
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
+# chunked uploads: each chunk stays under FILE_UPLOAD_MAX_MEMORY_SIZE so it never spills to a temp file
+UPLOAD_CHUNK_MAX_BYTES = 2 * 1024 * 1024  # 2MB
+
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+CHUNKED_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'upload_sessions')
+UPLOAD_SESSION_TTL_HOURS = 24  # unfinished uploads idle this long are removed by `manage.py reconcile_media`
+
+# deleted notes are purged by a background thread after the request;
+# set to False to leave it to `manage.py purge_deleted_notes` on a schedule
+NOTE_PURGE_ASYNC = True
+NOTE_PURGE_BATCH_SIZE = 200
+
 # OPENAI_API_KEY = 'your-api-key-here'
 
 SITE_ID = 1
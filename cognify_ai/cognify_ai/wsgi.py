@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cognify_ai.settings')
 
 application = get_wsgi_application()
+
+# With `gunicorn --preload`, this runs once in the master before workers fork,
+# so the model client and PDF engine are shared copy-on-write.
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_AI_PROVIDERS:
+    from notes.providers import prefork_warmup
+    prefork_warmup()
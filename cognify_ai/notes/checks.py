@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def test_ai_shared_limits_check(app_configs, **kwargs):
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.TEST_AI_SHARED_LIMITS and backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            "TEST_AI_SHARED_LIMITS is on but the default cache is not shared between workers.",
+            hint="Point CACHES at Redis or Memcached, or unset TEST_AI_SHARED_LIMITS to cap "
+                 "test-ai with lock files on this host.",
+            id='notes.W001',
+        )]
+    return []
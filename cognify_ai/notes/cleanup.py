@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils.timezone import now
+
+from .models import GeneratedContent, StudyCard, UploadSession, UserFeedback, UserNote
+from .uploads import discard_session_file
+
+logger = logging.getLogger(__name__)
+
+_purge_lock = threading.Lock()
+_purge_requested = threading.Event()
+
+
+def purge_deleted_notes(batch_size=None, older_than=timedelta(0)):
+    """
+    Hard-delete soft-deleted notes, a batch at a time.
+
+    Dependents are deleted leaf first with one query per table, so Django's
+    delete collector never has to walk them row by row. Uploaded files are
+    removed from storage once their batch has been committed.
+    """
+    batch_size = batch_size or settings.NOTE_PURGE_BATCH_SIZE
+    cutoff = now() - older_than
+    storage = UserNote._meta.get_field('file').storage
+    purged = 0
+
+    while True:
+        batch = list(
+            UserNote.objects.filter(deleted_at__lte=cutoff).order_by('id').values_list('id', 'file')[:batch_size]
+        )
+        if not batch:
+            return purged
+        note_ids = [note_id for note_id, _ in batch]
+
+        with transaction.atomic():
+            UserFeedback.objects.filter(generated_content__note_id__in=note_ids).delete()
+            StudyCard.objects.filter(generated_content__note_id__in=note_ids).delete()
+            GeneratedContent.objects.filter(note_id__in=note_ids).update(source=None)
+            GeneratedContent.objects.filter(note_id__in=note_ids).delete()
+            UploadSession.objects.filter(note_id__in=note_ids).delete()
+            UserNote.objects.filter(id__in=note_ids).delete()
+
+        for _, name in batch:
+            if name:
+                storage.delete(name)
+        purged += len(batch)
+
+
+def _purge_in_background():
+    # one purge per process at a time. A request that finds one running leaves
+    # the flag set, and the running thread goes round again after releasing
+    # the lock, so a note deleted as its last query returns isn't left behind.
+    _purge_requested.set()
+    while _purge_requested.is_set():
+        if not _purge_lock.acquire(blocking=False):
+            return
+        try:
+            _purge_requested.clear()
+            close_old_connections()
+            purge_deleted_notes()
+        except Exception:
+            logger.exception("Purging deleted notes failed.")
+        finally:
+            connections.close_all()
+            _purge_lock.release()
+
+
+def schedule_purge():
+    if settings.NOTE_PURGE_ASYNC:
+        threading.Thread(target=_purge_in_background, name='purge-deleted-notes', daemon=True).start()
+
+
+def expire_upload_sessions(ttl=None):
+    """Delete unfinished upload sessions idle for longer than ttl, with their part files."""
+    ttl = ttl if ttl is not None else timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    stale = UploadSession.objects.filter(note__isnull=True, updated_at__lt=now() - ttl)
+    expired = 0
+    for session in stale.only('id').iterator(chunk_size=500):
+        discard_session_file(session)
+        expired += 1
+    stale.delete()
+    return expired
+
+
+def find_orphaned_files(directory, referenced, grace):
+    """
+    Yield files anywhere under directory whose path relative to it is not in
+    referenced and that were not modified within grace.
+    """
+    cutoff = (now() - grace).timestamp()
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, directory) in referenced:
+                continue
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    yield path
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,20 @@
+def content_items(content_type, content):
+    """
+    Return the list of item dicts stored in a GeneratedContent.content blob.
+
+    Flashcards and quiz questions are normally a JSON array, but the model
+    sometimes wraps it in an object (e.g. {"flashcards": [...]}). Summaries
+    come back as a single {'summary': ...} item.
+    """
+    if content_type == 'summary':
+        if isinstance(content, dict):
+            return [content]
+        if isinstance(content, str):
+            return [{'summary': content}]
+        return []
+
+    if isinstance(content, dict):
+        content = next((value for value in content.values() if isinstance(value, list)), [])
+    if not isinstance(content, list):
+        return []
+    return [item for item in content if isinstance(item, dict)]
@@ -0,0 +1,76 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .content_items import content_items
+
+EXPORT_FIELDS = ('id', 'note_id', 'note__title', 'content_type', 'content', 'generation_parameters', 'created_at')
+
+
+class Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+    def write(self, value):
+        return value
+
+
+def _iter_rows(queryset, chunk_size):
+    return queryset.values(*EXPORT_FIELDS).order_by('note_id', 'id').iterator(chunk_size=chunk_size)
+
+
+def iter_csv(queryset, chunk_size):
+    """One row per flashcard, quiz question or summary."""
+    writer = csv.writer(Echo())
+    yield writer.writerow([
+        'note_id', 'note_title', 'generated_content_id', 'content_type', 'language',
+        'question', 'answer', 'options', 'summary'
+    ])
+    for row in _iter_rows(queryset, chunk_size):
+        language = (row['generation_parameters'] or {}).get('language', '')
+        for item in content_items(row['content_type'], row['content']):
+            yield writer.writerow([
+                row['note_id'], row['note__title'], row['id'], row['content_type'], language,
+                item.get('question', ''), item.get('answer', ''),
+                ' | '.join(str(option) for option in item.get('options') or []),
+                item.get('summary', ''),
+            ])
+
+
+def iter_jsonl(queryset, chunk_size):
+    """One JSON object per GeneratedContent, content kept as generated."""
+    for row in _iter_rows(queryset, chunk_size):
+        yield json.dumps({
+            'id': row['id'],
+            'note': row['note_id'],
+            'note_title': row['note__title'],
+            'content_type': row['content_type'],
+            'generation_parameters': row['generation_parameters'],
+            'content': row['content'],
+            'created_at': row['created_at'],
+        }, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def iter_anki(queryset, chunk_size):
+    """
+    Tab-separated deck for Anki's "Import File" dialog: front, back, tags.
+    Summaries have no question/answer shape and are left out.
+    """
+    writer = csv.writer(Echo(), delimiter='\t', lineterminator='\n')
+    yield '#separator:tab\n#html:false\n#deck:Cognify\n#tags column:3\n'
+    for row in _iter_rows(queryset.exclude(content_type='summary'), chunk_size):
+        tags = f"cognify::{row['content_type']} cognify::note_{row['note_id']}"
+        for item in content_items(row['content_type'], row['content']):
+            front = item.get('question', '')
+            if item.get('options'):
+                front += '\n' + '\n'.join(
+                    f"{chr(ord('A') + i)}. {option}" for i, option in enumerate(item['options'])
+                )
+            if front:
+                yield writer.writerow([front, item.get('answer', ''), tags])
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv', 'csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson', 'jsonl'),
+    'anki': (iter_anki, 'text/plain', 'txt'),
+}
@@ -0,0 +1,184 @@
+import json
+import re
+
+from .content_items import content_items
+
+MODEL_NAME = "models/gemini-1.5-flash"
+
+
+def generate_text(genai, prompt):
+    """Send a prompt to Gemini and return the raw response text."""
+    model = genai.GenerativeModel(model_name=MODEL_NAME)
+    response = model.generate_content(prompt)
+    return response.text  # Get raw string response
+
+
+# Process pool workers for offline generation. Kept free of Django imports
+# so they can be started with any multiprocessing start method.
+_worker_genai = None
+
+
+def init_worker(api_key):
+    global _worker_genai
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    _worker_genai = genai
+
+
+def generate_in_worker(job_id, prompt):
+    return job_id, generate_text(_worker_genai, prompt)
+
+
+def merge_chunk_results(results, content_type):
+    """Combine the structured output of a note generated piece by piece."""
+    if content_type == 'summary':
+        return {'summary': '\n\n'.join(
+            str(item.get('summary', '')).strip() for result in results for item in content_items(content_type, result)
+        )}
+    return [item for result in results for item in content_items(content_type, result)]
+
+
+def build_translation_prompt(content, content_type, source_language, target_language):
+    """Ask for an existing generation's items to be translated rather than generated again."""
+    keep_answer = (
+        "Each 'answer' must stay identical to one of its translated 'options'. "
+        if content_type == 'quiz_questions' else ""
+    )
+    return (
+        f"Translate every text value in the following JSON from {source_language} to {target_language}. "
+        f"Keep the same JSON structure, the same keys and the same number of items. "
+        f"{keep_answer}"
+        f"Only return valid JSON. Do not include extra text.\n\n"
+        f"{json.dumps(content, ensure_ascii=False)}"
+    )
+
+
+def translation_matches(source_content, translated_content, content_type):
+    """A translation is only usable if it kept every item of the source."""
+    source_items = content_items(content_type, source_content)
+    translated_items = content_items(content_type, translated_content)
+    return len(translated_items) == len(source_items) and all(
+        item.keys() >= source.keys() for source, item in zip(source_items, translated_items)
+    )
+
+
+def build_prompt(note_content, content_type, params):
+    complexity = params['complexity']
+    language = params['language']
+    length = params.get('length', 'medium')
+
+    if content_type == 'flashcards':
+        return (
+            # f"You are a helpful assistant. Generate flashcards from this note. "
+            # f"Complexity: {complexity}. Language: {language}. "
+            # f"Return as JSON: [{{'question': '...', 'answer': '...'}}].\n\n{note_content}"
+            f"Create flashcards from the following text. "
+            f"Each flashcard should be returned as a JSON object with 'question' and 'answer'. "
+            f"Only return a valid JSON array. Do not include extra text.\n\n"
+            f"Complexity: {complexity}. Language: {language}.\n\n{note_content}"
+
+        )
+    elif content_type == 'summary':
+        return (
+            f"Summarize the following text into a {length} summary. "
+            f"Complexity: {complexity}. Language: {language}. "
+            f"Return as JSON: {{'summary': '...'}}.\n\n{note_content}"
+        )
+    elif content_type == 'quiz_questions':
+        return (
+            # f"Generate quiz questions from this content. Complexity: {complexity}. Language: {language}. "
+            # f"Each question must have 4 multiple-choice answers and the correct answer marked. "
+            # f"Return as JSON: [{{'question': '...', 'options': [...], 'correct_answer': '...'}}].\n\n{note_content}"
+            f"Generate multiple-choice quiz questions from the following text. "
+            f"Each question must be a JSON object with:\n"
+            f"- 'question': the question string\n"
+            f"- 'options': an array of 4 choices\n"
+            f"- 'answer': the correct answer (must match one of the options)\n\n"
+            f"Return a valid JSON array like this:\n"
+            f"[{{\"question\": \"...\", \"options\": [\"...\", \"...\", \"...\", \"...\"], \"answer\": \"...\"}}, ...]\n"
+            f"No explanation. JSON only.\n\n"
+            f"Complexity: {complexity}. Language: {language}.\n\n{note_content}"
+        )
+    return note_content
+
+
+def structure_ai_response(ai_response, content_type):
+    """Convert AI response to structured JSON"""
+    try:
+        # Try to parse as JSON directly
+        return json.loads(ai_response)
+    except json.JSONDecodeError:
+        # If not valid JSON, handle based on content type
+
+        if content_type == 'summary':
+            return {'summary': ai_response}
+
+
+
+        elif content_type == 'flashcards':
+            # Try to parse flashcard format if not JSON
+            flashcards = []
+            lines = ai_response.strip().split('\n')
+            question, answer = None, None
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+
+                if '?' in line and not line.lower().startswith("a:"):
+                    if question and answer:
+                        flashcards.append({
+                            "question": question.strip(),
+                            "answer": answer.strip()
+                        })
+                    question = line
+                    answer = ""
+                elif question:
+                    if line.lower().startswith("a:"):
+                        answer = line[2:].strip()
+                    else:
+                        answer += " " + line.strip()
+
+            if question and answer:
+                flashcards.append({
+                    "question": question.strip(),
+                    "answer": answer.strip()
+                })
+            return flashcards
+
+        elif content_type == 'quiz_questions':
+             # Try to extract a valid JSON array from the text using regex
+            try:
+                # Extract the first JSON array in the response
+                match = re.search(r'\[\s*\{.*?\}\s*\]', ai_response, re.DOTALL)
+                if match:
+                    json_str = match.group(0)
+                    return json.loads(json_str)
+            except Exception:
+                pass
+
+            # Fallback to custom parsing
+            quiz_items = []
+            lines = ai_response.strip().split('\n')
+            question, options, correct_answer = "", [], ""
+
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                if '?' in line and not options:
+                    question = line
+                    options = []
+                elif re.match(r"^[-\d\.\)]\s*", line):  # e.g., "- Option", "1. Option", "a) Option"
+                    option_text = re.sub(r"^[-\d\.\)]\s*", '', line).strip()
+                    options.append(option_text)
+                elif line.lower().startswith("answer:"):
+                    correct_answer = line.split(":", 1)[1].strip()
+                    if question and options and correct_answer:
+                        quiz_items.append({
+                            "question": question,
+                            "options": options,
+                            "answer": correct_answer
+                        })
+                        question, options, correct_answer = "", [], ""
+            return quiz_items
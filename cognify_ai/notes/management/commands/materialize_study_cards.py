@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from notes.models import GeneratedContent
+from notes.study import CARD_TYPES, materialize_cards
+
+
+class Command(BaseCommand):
+    help = "Create study cards for flashcards and quiz questions generated before cards existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = (
+            GeneratedContent.objects
+            .filter(content_type__in=CARD_TYPES, source__isnull=True, cards__isnull=True)
+            .select_related('note')
+            .iterator(chunk_size=batch_size)
+        )
+
+        batch, created = [], 0
+        for generated_content in pending:
+            batch.append(generated_content)
+            if len(batch) >= batch_size:
+                created += materialize_cards(batch)
+                batch = []
+        created += materialize_cards(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Created {created} study cards."))
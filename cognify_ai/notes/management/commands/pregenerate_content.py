@@ -0,0 +1,224 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+
+from notes.generation import build_prompt, generate_in_worker, init_worker, structure_ai_response
+from notes.models import GeneratedContent, GeneratedContentType, UserNote
+from notes.serializers import GenerateContentRequestSerializer
+from notes.study import materialize_cards
+from notes.tokens import estimate_tokens, plan_generation
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate missing flashcards, summaries and quiz questions for existing notes ahead of time. "
+        "Notes that already have a content type are skipped, so an interrupted run can simply be restarted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--content-types', nargs='+', choices=GeneratedContentType.values,
+                            default=GeneratedContentType.values)
+        parser.add_argument('--user', help="Username, email or id of a single user.")
+        parser.add_argument('--since', type=_parse_date, help="Only notes created on or after YYYY-MM-DD.")
+        parser.add_argument('--until', type=_parse_date, help="Only notes created before YYYY-MM-DD.")
+        parser.add_argument('--note-ids', nargs='+', type=int)
+        parser.add_argument('--complexity', default='medium')
+        parser.add_argument('--length', default='medium')
+        parser.add_argument('--language', default='english')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--rate', type=float, default=60, help="Max model calls per minute, 0 for no limit.")
+        parser.add_argument('--batch-size', type=int, default=50, help="Rows written per bulk_create.")
+        parser.add_argument('--max-calls', type=int, help="Stop after this many model calls.")
+        parser.add_argument('--max-tokens', type=int, help="Stop once this many estimated input tokens were sent.")
+        parser.add_argument('--respect-quota', action='store_true',
+                            help="Charge generations to each student's daily limits (MAX_DAILY_GENERATIONS and "
+                                 "GENERATION_DAILY_TOKEN_BUDGET) and skip students over them. By default "
+                                 "pre-generated content is marked and does not count against those limits.")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        params = self._generation_params(options)
+        jobs = self._iter_jobs(options)
+
+        if options['dry_run']:
+            total = sum(1 for _ in jobs)
+            self.stdout.write(f"{total} generations would be made.")
+            return
+
+        self.stats = {'generated': 0, 'failed': 0, 'skipped_quota': 0, 'calls': 0, 'tokens': 0}
+        self.pending = []
+        self.batch_size = options['batch_size']
+        quota = _DailyQuota() if options['respect_quota'] else None
+        self.mark_pregenerated = not options['respect_quota']
+        interval = 60 / options['rate'] if options['rate'] else 0
+        next_slot = time.monotonic()
+        started = time.monotonic()
+
+        in_flight = {}
+        executor = ProcessPoolExecutor(
+            max_workers=options['workers'], initializer=init_worker, initargs=(settings.GEMINI_API_KEY,)
+        )
+        try:
+            for job_id, (note, content_type) in enumerate(jobs):
+                if options['max_calls'] is not None and self.stats['calls'] >= options['max_calls']:
+                    self.stdout.write("Call budget reached, stopping.")
+                    break
+                # offline runs never chunk: oversized notes are truncated to a single call
+                plan = plan_generation(
+                    note.content, note.token_count or estimate_tokens(note.content),
+                    {**params, 'content_type': content_type, 'strategy': 'truncate'}
+                )
+                if options['max_tokens'] is not None and self.stats['tokens'] + plan.input_tokens > options['max_tokens']:
+                    self.stdout.write("Token budget reached, stopping.")
+                    break
+                if quota and not quota.take(note.user_id, plan.input_tokens):
+                    self.stats['skipped_quota'] += 1
+                    continue
+
+                # keep at most two jobs per worker queued so results are written as they arrive
+                while len(in_flight) >= options['workers'] * 2:
+                    self._collect(in_flight, params, wait(in_flight, return_when=FIRST_COMPLETED).done)
+
+                delay = next_slot - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                next_slot = max(next_slot, time.monotonic()) + interval
+
+                prompt = build_prompt(plan.pieces[0], content_type, params)
+                in_flight[executor.submit(generate_in_worker, job_id, prompt)] = (note, content_type, plan)
+                self.stats['calls'] += 1
+                self.stats['tokens'] += plan.input_tokens
+
+            while in_flight:
+                self._collect(in_flight, params, wait(in_flight, return_when=FIRST_COMPLETED).done)
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted, saving finished results. Re-run the command to resume.")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._collect(in_flight, params, [f for f in in_flight if f.done() and not f.cancelled()])
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._flush()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {self.stats['generated']}, failed {self.stats['failed']}, "
+            f"skipped (quota) {self.stats['skipped_quota']}, ~{self.stats['tokens']} input tokens in {elapsed:.1f}s "
+            f"({self.stats['generated'] / elapsed if elapsed else 0:.2f} generations/s, "
+            f"{self.stats['calls'] / elapsed * 60 if elapsed else 0:.1f} calls/min)."
+        ))
+
+    def _generation_params(self, options):
+        serializer = GenerateContentRequestSerializer(data={
+            'content_type': options['content_types'][0],
+            'complexity': options['complexity'],
+            'length': options['length'],
+            'language': options['language'],
+        })
+        if not serializer.is_valid():
+            raise CommandError(serializer.errors)
+        params = dict(serializer.validated_data)
+        params.pop('content_type')
+        return params
+
+    def _iter_jobs(self, options):
+        notes = UserNote.objects.filter(deleted_at__isnull=True).exclude(content='')
+        if options['user']:
+            notes = notes.filter(user=_find_user(options['user']))
+        if options['since']:
+            notes = notes.filter(created_at__date__gte=options['since'])
+        if options['until']:
+            notes = notes.filter(created_at__date__lt=options['until'])
+        if options['note_ids']:
+            notes = notes.filter(id__in=options['note_ids'])
+
+        missing = {}
+        for content_type in options['content_types']:
+            existing = GeneratedContent.objects.filter(
+                note=OuterRef('pk'),
+                content_type=content_type,
+                generation_parameters__language__iexact=options['language'],
+                generation_parameters__complexity=options['complexity']
+            )
+            if content_type == 'summary':
+                existing = existing.filter(generation_parameters__length=options['length'])
+            missing[content_type] = ~Exists(existing)
+        notes = notes.annotate(**{f'missing_{ct}': expr for ct, expr in missing.items()})
+        notes = notes.filter(Q(*[Q(**{f'missing_{ct}': True}) for ct in missing], _connector=Q.OR))
+
+        for note in notes.only('id', 'user_id', 'title', 'content', 'token_count').order_by('id').iterator(chunk_size=200):
+            for content_type in options['content_types']:
+                if getattr(note, f'missing_{content_type}'):
+                    yield note, content_type
+
+    def _collect(self, in_flight, params, done):
+        for future in done:
+            note, content_type, plan = in_flight.pop(future)
+            try:
+                _, ai_response = future.result()
+            except Exception as e:
+                self.stats['failed'] += 1
+                self.stderr.write(f"Note {note.id} ({content_type}) failed: {e}")
+                continue
+            self.pending.append(GeneratedContent(
+                note=note,
+                content_type=content_type,
+                content=structure_ai_response(ai_response, content_type),
+                generation_parameters={
+                    'content_type': content_type, **params, 'strategy': plan.strategy,
+                    **({'pregenerated': True} if self.mark_pregenerated else {})
+                },
+                input_tokens=plan.input_tokens,
+                output_tokens=estimate_tokens(ai_response)
+            ))
+            if len(self.pending) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        created = GeneratedContent.objects.bulk_create(self.pending)
+        # bulk_create does not send post_save, so study cards are made here
+        materialize_cards(created)
+        self.stats['generated'] += len(created)
+        self.pending = []
+
+
+class _DailyQuota:
+    """Tracks each user's charged generations and tokens today, including the ones made by this run."""
+    def __init__(self):
+        self.used = {}
+
+    def take(self, user_id, input_tokens):
+        if user_id not in self.used:
+            self.used[user_id] = GeneratedContent.objects.charged_today(user_id).aggregate(
+                count=Count('id'), tokens=Sum(F('input_tokens') + F('output_tokens'))
+            )
+            self.used[user_id]['tokens'] = self.used[user_id]['tokens'] or 0
+        used = self.used[user_id]
+        if used['count'] >= settings.MAX_DAILY_GENERATIONS:
+            return False
+        if used['tokens'] + input_tokens > settings.GENERATION_DAILY_TOKEN_BUDGET:
+            return False
+        used['count'] += 1
+        used['tokens'] += input_tokens
+        return True
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _find_user(value):
+    User = get_user_model()
+    lookup = Q(username=value) | Q(email=value)
+    if value.isdigit():
+        lookup |= Q(id=int(value))
+    try:
+        return User.objects.get(lookup)
+    except (User.DoesNotExist, User.MultipleObjectsReturned):
+        raise CommandError(f"No single user matches '{value}'.")
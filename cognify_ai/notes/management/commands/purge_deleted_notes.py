@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from notes.cleanup import purge_deleted_notes
+
+
+class Command(BaseCommand):
+    help = "Permanently remove soft-deleted notes, their generated content and their uploaded files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--older-than-minutes', type=int, default=0)
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_notes(
+            batch_size=options['batch_size'],
+            older_than=timedelta(minutes=options['older_than_minutes'])
+        )
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} deleted notes."))
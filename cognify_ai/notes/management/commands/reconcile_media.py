@@ -0,0 +1,63 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes.cleanup import expire_upload_sessions, find_orphaned_files
+from notes.models import UploadSession, UserNote
+from notes.uploads import session_file_path
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete files under user_notes/ that no UserNote.file points to, expire chunked "
+        "upload sessions idle longer than UPLOAD_SESSION_TTL_HOURS, and delete part files "
+        "whose session is gone."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help="Leave files modified more recently than this alone (uploads in progress).")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        grace = timedelta(minutes=options['grace_minutes'])
+        storage = UserNote._meta.get_field('file').storage
+
+        if not options['dry_run']:
+            expired = expire_upload_sessions()
+            self.stdout.write(f"Expired {expired} abandoned upload sessions.")
+
+        # soft-deleted notes still count as references; purge_deleted_notes removes their files
+        note_files = {
+            os.path.normpath(os.path.relpath(name, 'user_notes'))
+            for name in UserNote.objects.exclude(file='').exclude(file__isnull=True)
+            .values_list('file', flat=True).iterator(chunk_size=2000)
+        }
+        part_files = {
+            os.path.basename(session_file_path(session))
+            for session in UploadSession.objects.filter(note__isnull=True).only('id').iterator(chunk_size=2000)
+        }
+
+        orphans = [
+            *find_orphaned_files(storage.path('user_notes'), note_files, grace),
+            *find_orphaned_files(settings.CHUNKED_UPLOAD_DIR, part_files, grace),
+        ]
+        removed = 0
+        for path in orphans:
+            if options['dry_run']:
+                self.stdout.write(path)
+            elif self._referenced_now(storage, path):
+                continue
+            else:
+                os.remove(path)
+            removed += 1
+
+        action = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{action} {removed} orphaned files."))
+
+    def _referenced_now(self, storage, path):
+        # an upload finalized after note_files was read points at a file the scan saw as orphaned
+        name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+        return UserNote.objects.filter(file=name).exists()
@@ -0,0 +1,59 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes.providers import provider_names
+
+# runs in a fresh interpreter so nothing is already imported
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import notes.urls
+booted = time.perf_counter()
+if sys.argv[1:]:
+    from notes.providers import warmup
+    warmup(sys.argv[1:])
+loaded = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+except ImportError:
+    rss = None
+print(json.dumps({'boot': booted - start, 'providers': loaded - booted, 'max_rss_kb': rss}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start import time and resident memory, with and without the lazy providers loaded."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _probe(self, providers):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'cognify_ai.settings'))
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE, *providers],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        scenarios = [('startup', [])] + [(name, [name]) for name in provider_names()] + [('all providers', provider_names())]
+
+        self.stdout.write(f"{'scenario':<16}{'boot ms':>10}{'providers ms':>14}{'max rss MB':>12}")
+        for label, providers in scenarios:
+            runs = [self._probe(providers) for _ in range(options['repeat'])]
+            boot = statistics.median(run['boot'] for run in runs) * 1000
+            loaded = statistics.median(run['providers'] for run in runs) * 1000
+            rss = runs[-1]['max_rss_kb']
+            rss = f"{rss / 1024:.1f}" if rss is not None else "n/a"
+            self.stdout.write(f"{label:<16}{boot:>10.1f}{loaded:>14.1f}{rss:>12}")
@@ -4,6 +4,7 @@ from django.utils import timezone
 import uuid
 import os
 from django.utils.text import slugify
+from .tokens import estimate_tokens
 
 def safe_file_upload_path(instance, filename):
     ext = filename.split('.')[-1]
@@ -15,8 +16,18 @@ class UserNote(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
     file = models.FileField(upload_to=safe_file_upload_path, null=True, blank=True)
+    token_count = models.PositiveIntegerField(default=0)  # estimated, kept in sync with content on save
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # set on delete; the row, its dependents and its file are removed later by notes.cleanup
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def save(self, *args, **kwargs):
+        self.token_count = estimate_tokens(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'token_count'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.title} - {self.user.email}"
@@ -26,12 +37,30 @@ class GeneratedContentType(models.TextChoices):
     SUMMARY = 'summary', 'Summary'
     QUIZ_QUESTIONS = 'quiz_questions', 'Quiz Questions'
 
+class GeneratedContentQuerySet(models.QuerySet):
+    def charged_today(self, user):
+        """Today's generations that count toward the user's daily limits."""
+        # content made by `manage.py pregenerate_content` is marked and not charged to the student
+        return self.filter(
+            models.Q(generation_parameters__isnull=True)
+            | models.Q(generation_parameters__pregenerated__isnull=True)
+            | models.Q(generation_parameters__pregenerated=False),
+            note__user=user,
+            created_at__date=timezone.now().date()
+        )
+
 class GeneratedContent(models.Model):
     note = models.ForeignKey(UserNote, on_delete=models.CASCADE, related_name='generated_contents')
     content_type = models.CharField(max_length=20, choices=GeneratedContentType.choices)
     content = models.JSONField()
     created_at = models.DateTimeField(default=timezone.now)
     generation_parameters = models.JSONField(null=True, blank=True)  # stores poarams used for generation
+    input_tokens = models.PositiveIntegerField(default=0)  # estimated
+    output_tokens = models.PositiveIntegerField(default=0)  # estimated
+    # set when this row was translated from another language instead of generated from the note
+    source = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='translations')
+
+    objects = GeneratedContentQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.get_content_type_display()} for {self.note.title}"
@@ -47,4 +76,57 @@ class UserFeedback(models.Model):
         unique_together = ('generated_content', 'user')
 
     def __str__(self):
-        return f"Feedback by {self.user.email} - {self.rating} stars"
\ No newline at end of file
+        return f"Feedback by {self.user.email} - {self.rating} stars"
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload that becomes a UserNote once finalized."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, blank=True)
+    content = models.TextField(blank=True)
+    total_size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    next_chunk = models.PositiveIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True)  # running hash chain over received chunks
+    note = models.OneToOneField(UserNote, on_delete=models.CASCADE, null=True, blank=True, related_name='upload_session')  # set on finalize
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_complete(self):
+        return self.received_bytes == self.total_size
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.received_bytes}/{self.total_size}) - {self.user.email}"
+
+
+class StudyCardType(models.TextChoices):
+    FLASHCARD = 'flashcard', 'Flashcard'
+    QUIZ = 'quiz', 'Quiz Question'
+
+class StudyCard(models.Model):
+    """A single flashcard or quiz question with its spaced-repetition state."""
+    # copied from note.user so the due queue is one range scan on (user, due_at)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='study_cards')
+    generated_content = models.ForeignKey(GeneratedContent, on_delete=models.CASCADE, related_name='cards')
+    position = models.PositiveIntegerField()  # index of the item in generated_content.content
+    card_type = models.CharField(max_length=20, choices=StudyCardType.choices)
+    question = models.TextField()
+    answer = models.TextField(blank=True)
+    options = models.JSONField(null=True, blank=True)
+    due_at = models.DateTimeField(default=timezone.now)
+    interval_days = models.FloatField(default=0)
+    ease_factor = models.FloatField(default=2.5)
+    repetitions = models.PositiveIntegerField(default=0)
+    lapses = models.PositiveIntegerField(default=0)
+    last_reviewed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('generated_content', 'position')
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='studycard_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_card_type_display()} #{self.position} for {self.generated_content}"
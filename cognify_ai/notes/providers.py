@@ -0,0 +1,65 @@
+"""
+Lazily loaded heavy dependencies.
+
+google.generativeai and PyMuPDF take a noticeable share of process startup,
+so they are imported on first use instead of when notes.views is loaded.
+Call warmup() before forking workers to load them once in the parent.
+"""
+import gc
+import threading
+
+from django.conf import settings
+
+_loaders = {}
+_providers = {}
+_lock = threading.Lock()
+
+
+def register_provider(name, loader):
+    _loaders[name] = loader
+
+
+def provider_names():
+    return list(_loaders)
+
+
+def get_provider(name):
+    try:
+        return _providers[name]
+    except KeyError:
+        pass
+    with _lock:
+        if name not in _providers:
+            _providers[name] = _loaders[name]()
+        return _providers[name]
+
+
+def warmup(names=None):
+    for name in names or list(_loaders):
+        get_provider(name)
+
+
+def prefork_warmup():
+    """
+    Load every provider and move everything allocated so far out of the
+    garbage collector's reach, so forked workers keep sharing those pages
+    copy-on-write instead of dirtying them on the first collection.
+    """
+    warmup()
+    gc.collect()
+    gc.freeze()
+
+
+def _load_genai():
+    import google.generativeai as genai
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    return genai
+
+
+def _load_pdf():
+    import fitz
+    return fitz
+
+
+register_provider('genai', _load_genai)
+register_provider('pdf', _load_pdf)
@@ -1,6 +1,8 @@
 from rest_framework import serializers
-from .models import UserNote, GeneratedContent, UserFeedback, GeneratedContentType
+from .models import UserNote, GeneratedContent, UserFeedback, GeneratedContentType, UploadSession, StudyCard
 from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils.text import get_valid_filename
 
 class UserNoteSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -8,8 +10,8 @@ class UserNoteSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = UserNote
-        fields = ['id', 'user', 'title', 'content', 'file', 'file_url', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at', 'file_url']
+        fields = ['id', 'user', 'title', 'content', 'file', 'file_url', 'token_count', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'file_url', 'token_count']
         extra_kwargs = {
             'title': {'required': False},
             'content': {'required': False}
@@ -33,8 +35,8 @@ class UserNoteSerializer(serializers.ModelSerializer):
 class GeneratedContentSerializer(serializers.ModelSerializer):
     class Meta:
         model = GeneratedContent
-        fields = ['id', 'note', 'content_type', 'content', 'created_at']
-        read_only_fields = ['created_at']
+        fields = ['id', 'note', 'content_type', 'content', 'source', 'input_tokens', 'output_tokens', 'created_at']
+        read_only_fields = ['created_at', 'source', 'input_tokens', 'output_tokens']
 
 class UserFeedbackSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -48,4 +50,79 @@ class GenerateContentRequestSerializer(serializers.Serializer):
     content_type = serializers.ChoiceField(choices=GeneratedContentType.choices)
     complexity = serializers.ChoiceField(choices=['easy', 'medium', 'hard'], default='medium')
     length = serializers.ChoiceField(choices=['short', 'medium', 'detailed'], default='medium')
-    language = serializers.CharField(default='english', max_length=50)
\ No newline at end of file
+    language = serializers.CharField(default='english', max_length=50)
+    # how to handle notes too long for one model call, see notes.tokens.plan_generation
+    strategy = serializers.ChoiceField(choices=['auto', 'direct', 'truncate', 'chunk'], default='auto')
+    # translate an existing generation in another language instead of starting from the note
+    reuse_translation = serializers.BooleanField(default=True)
+
+class ExportFilterSerializer(serializers.Serializer):
+    note = serializers.ListField(child=serializers.IntegerField(), required=False)
+    content_type = serializers.ListField(
+        child=serializers.ChoiceField(choices=GeneratedContentType.choices), required=False
+    )
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'user', 'filename', 'title', 'content', 'total_size',
+            'received_bytes', 'next_chunk', 'checksum', 'note', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['received_bytes', 'next_chunk', 'checksum', 'note', 'created_at', 'updated_at']
+
+    def validate_filename(self, filename):
+        # only a plain file name is kept; the storage path is built by safe_file_upload_path
+        if '/' in filename or '\\' in filename:
+            raise serializers.ValidationError("Filename must not contain path separators.")
+        try:
+            return get_valid_filename(filename)
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("Invalid filename.")
+
+    def validate_total_size(self, total_size):
+        # reject oversized files before a single byte is uploaded
+        if total_size == 0:
+            raise serializers.ValidationError("File is empty.")
+        if total_size > settings.MAX_FILE_SIZE_BYTES:
+            raise serializers.ValidationError(f"File size exceeds {settings.MAX_FILE_SIZE_MB}MB limit.")
+        return total_size
+
+class UploadChunkSerializer(serializers.Serializer):
+    index = serializers.IntegerField(min_value=0)
+    chunk = serializers.FileField()
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)  # sha256 of this chunk
+
+    def validate_chunk(self, chunk):
+        if chunk.size > settings.UPLOAD_CHUNK_MAX_BYTES:
+            raise serializers.ValidationError(
+                f"Chunk size exceeds {settings.UPLOAD_CHUNK_MAX_BYTES} bytes."
+            )
+        return chunk
+
+class FinalizeUploadSerializer(serializers.Serializer):
+    checksum = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False)  # expected hash chain
+
+
+class StudyCardSerializer(serializers.ModelSerializer):
+    note = serializers.IntegerField(source='generated_content.note_id', read_only=True)
+
+    class Meta:
+        model = StudyCard
+        fields = [
+            'id', 'generated_content', 'note', 'position', 'card_type', 'question', 'answer', 'options',
+            'due_at', 'interval_days', 'ease_factor', 'repetitions', 'lapses', 'last_reviewed_at'
+        ]
+        read_only_fields = fields
+
+class DueCardsQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+class CardReviewSerializer(serializers.Serializer):
+    card = serializers.IntegerField()
+    grade = serializers.IntegerField(min_value=0, max_value=5)  # SM-2 recall quality
+
+class ReviewBatchSerializer(serializers.Serializer):
+    reviews = CardReviewSerializer(many=True, allow_empty=False, max_length=200)
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import GeneratedContent
+from .study import materialize_cards
+
+
+@receiver(post_save, sender=GeneratedContent)
+def create_study_cards(sender, instance, created, raw=False, **kwargs):
+    # bulk_create skips this signal; callers creating content in bulk call materialize_cards themselves
+    if created and not raw:
+        materialize_cards([instance])
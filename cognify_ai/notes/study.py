@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from .content_items import content_items
+from .models import StudyCard, StudyCardType
+
+CARD_TYPES = {
+    'flashcards': StudyCardType.FLASHCARD,
+    'quiz_questions': StudyCardType.QUIZ,
+}
+
+MIN_EASE_FACTOR = 1.3
+RELEARN_DELAY = timedelta(minutes=10)
+
+
+def build_cards(generated_content):
+    card_type = CARD_TYPES.get(generated_content.content_type)
+    # translations are the same items as their source, which already has cards
+    if card_type is None or generated_content.source_id is not None:
+        return []
+
+    cards = []
+    for position, item in enumerate(content_items(generated_content.content_type, generated_content.content)):
+        question = str(item.get('question') or '').strip()
+        if not question:
+            continue
+        cards.append(StudyCard(
+            user_id=generated_content.note.user_id,
+            generated_content=generated_content,
+            position=position,
+            card_type=card_type,
+            question=question,
+            answer=str(item.get('answer') or '').strip(),
+            options=item.get('options') if card_type == StudyCardType.QUIZ else None,
+        ))
+    return cards
+
+
+def materialize_cards(generated_contents):
+    """Create StudyCard rows for flashcard and quiz items. Safe to re-run."""
+    cards = []
+    for generated_content in generated_contents:
+        cards.extend(build_cards(generated_content))
+    StudyCard.objects.bulk_create(cards, batch_size=500, ignore_conflicts=True)
+    return len(cards)
+
+
+def schedule_review(card, grade, reviewed_at):
+    """
+    Apply one SM-2 review to the card in place.
+
+    grade is 0-5; anything below 3 is a lapse and the card comes back
+    after a short relearning delay.
+    """
+    if grade < 3:
+        card.repetitions = 0
+        card.lapses += 1
+        card.interval_days = 0
+        card.due_at = reviewed_at + RELEARN_DELAY
+    else:
+        if card.repetitions == 0:
+            card.interval_days = 1
+        elif card.repetitions == 1:
+            card.interval_days = 6
+        else:
+            card.interval_days = round(card.interval_days * card.ease_factor, 2)
+        card.repetitions += 1
+        card.due_at = reviewed_at + timedelta(days=card.interval_days)
+
+    card.ease_factor = max(
+        MIN_EASE_FACTOR,
+        card.ease_factor + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+    )
+    card.last_reviewed_at = reviewed_at
+    return card
@@ -0,0 +1,229 @@
+"""
+Abuse protection for the anonymous test-ai endpoint.
+
+Limits are kept in process memory by default. Set TEST_AI_SHARED_LIMITS to
+keep them in the Django cache instead, which shares them between workers
+when CACHES points at a shared backend such as Redis or Memcached. The
+concurrency cap spans all workers on the host either way.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Request body is too large."
+    default_code = 'payload_too_large'
+
+
+def request_fingerprint(data):
+    """Stable hash of the inputs that decide a test-ai response."""
+    if not hasattr(data, 'get'):
+        data = {}
+    normalized = json.dumps([
+        ' '.join(str(data.get('text', '')).split()),
+        str(data.get('mode', '')),
+        str(data.get('complexity', 'medium')).lower(),
+        str(data.get('language', 'English')).lower(),
+    ])
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+class SlidingWindowLimiter:
+    """Allows at most `limit` hits per key in any `window` seconds."""
+    SWEEP_EVERY = 1000
+
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self._hits = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def hit(self, key):
+        """Record a hit. Returns 0 if allowed, else seconds until the next slot frees up."""
+        if settings.TEST_AI_SHARED_LIMITS:
+            return self._hit_cache(key)
+        return self._hit_local(key)
+
+    def _hit_local(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return hits[0] + self.window - now
+            hits.append(now)
+            return 0
+
+    def _sweep(self, now):
+        # forget keys with no hits inside the window so memory stays bounded
+        stale = [key for key, hits in self._hits.items() if not hits or hits[-1] <= now - self.window]
+        for key in stale:
+            del self._hits[key]
+
+    def _hit_cache(self, key):
+        """
+        Sliding window approximated from two fixed-window counters, so every
+        update is an atomic cache.incr: the previous window's count is weighted
+        by how much of it still overlaps the sliding window.
+        """
+        now = time.time()
+        bucket = int(now // self.window)
+        elapsed = now - bucket * self.window
+        current_key = f'test-ai:limit:{self.name}:{key}:{bucket}'
+        previous = cache.get(f'test-ai:limit:{self.name}:{key}:{bucket - 1}', 0)
+
+        cache.add(current_key, 0, self.window * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:  # evicted between add and incr
+            cache.add(current_key, 1, self.window * 2)
+            current = 1
+
+        if previous * (1 - elapsed / self.window) + current > self.limit:
+            cache.decr(current_key)
+            return self.window - elapsed
+        return 0
+
+
+class _SlidingWindowThrottle(BaseThrottle):
+    limiter = None
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = self.limiter.hit(self.get_key(request))
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class TestAIIPThrottle(_SlidingWindowThrottle):
+    limiter = SlidingWindowLimiter('ip', *settings.TEST_AI_IP_RATE)
+
+    def get_key(self, request):
+        # honours REST_FRAMEWORK['NUM_PROXIES']; at the default of 0 this is
+        # REMOTE_ADDR, so clients can't choose their key via X-Forwarded-For
+        return self.get_ident(request)
+
+
+class TestAIFingerprintThrottle(_SlidingWindowThrottle):
+    """
+    Catches the same payload replayed from many addresses. The view checks it
+    only on response-cache misses, since cache hits cost no model call.
+    """
+    limiter = SlidingWindowLimiter('fingerprint', *settings.TEST_AI_FINGERPRINT_RATE)
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+
+    def get_key(self, request):
+        return self.fingerprint
+
+
+class ConcurrencyPool:
+    """
+    Non-blocking cap of `slots` concurrent calls across all workers, so
+    low-priority traffic can't hold more than its share of request threads.
+
+    By default each slot is a lock file under `lock_dir`, held with a
+    non-blocking flock. That covers every worker process on the host without
+    a shared cache, and the kernel drops the lock if a worker dies mid-call.
+    With TEST_AI_SHARED_LIMITS each slot is a cache key taken with an atomic
+    cache.add instead, which also spans hosts. It expires after
+    `lease_seconds` if its worker dies.
+    """
+    def __init__(self, name, slots, lock_dir, lease_seconds):
+        self.name = name
+        self.slots = slots
+        self.lock_dir = lock_dir
+        self.lease_seconds = lease_seconds
+        self._held = threading.local()
+        # no flock on Windows; fall back to a per-process cap for local development
+        self._semaphore = threading.BoundedSemaphore(slots) if fcntl is None else None
+
+    def acquire(self):
+        if settings.TEST_AI_SHARED_LIMITS:
+            return self._acquire_cache()
+        if fcntl is None:
+            return self._acquire_semaphore()
+        return self._acquire_file()
+
+    def release(self):
+        held, self._held.slot = getattr(self._held, 'slot', None), None
+        if held is None:
+            return
+        kind, slot, token = held
+        if kind == 'semaphore':
+            self._semaphore.release()
+        elif kind == 'file':
+            fcntl.flock(slot, fcntl.LOCK_UN)
+            os.close(slot)
+        elif cache.get(slot) == token:
+            # don't free a slot that expired and was taken by another call meanwhile
+            cache.delete(slot)
+
+    def _slot_order(self):
+        start = random.randrange(self.slots)
+        return [(start + offset) % self.slots for offset in range(self.slots)]
+
+    def _acquire_semaphore(self):
+        if not self._semaphore.acquire(blocking=False):
+            return False
+        self._held.slot = ('semaphore', None, None)
+        return True
+
+    def _acquire_file(self):
+        os.makedirs(self.lock_dir, exist_ok=True)
+        for index in self._slot_order():
+            fd = os.open(os.path.join(self.lock_dir, f'{self.name}-{index}.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            self._held.slot = ('file', fd, None)
+            return True
+        return False
+
+    def _acquire_cache(self):
+        token = uuid.uuid4().hex
+        for index in self._slot_order():
+            slot_key = f'test-ai:pool:{self.name}:{index}'
+            if cache.add(slot_key, token, self.lease_seconds):
+                self._held.slot = ('cache', slot_key, token)
+                return True
+        return False
+
+
+test_ai_pool = ConcurrencyPool(
+    'test-ai',
+    slots=settings.TEST_AI_MAX_CONCURRENT,
+    lock_dir=settings.TEST_AI_LOCK_DIR,
+    lease_seconds=settings.TEST_AI_CALL_LEASE_SECONDS,
+)
@@ -0,0 +1,110 @@
+"""
+Local, pre-flight token estimates for generation requests.
+
+Counts are approximate: characters divided by a per-model chars-per-token
+ratio, with non-ASCII text (which tokenizes much less densely) weighted
+separately. Tune TOKEN_ESTIMATOR_CALIBRATION against the usage the model
+reports for real requests.
+"""
+import math
+from collections import namedtuple
+
+from django.conf import settings
+
+from .generation import MODEL_NAME, build_prompt
+
+DEFAULT_CALIBRATION = {'chars_per_token': 4.0, 'non_ascii_chars_per_token': 1.5}
+
+GenerationPlan = namedtuple('GenerationPlan', ['strategy', 'pieces', 'input_tokens'])
+
+
+class TokenBudgetExceeded(Exception):
+    pass
+
+
+def _calibration(model_name):
+    return {**DEFAULT_CALIBRATION, **settings.TOKEN_ESTIMATOR_CALIBRATION.get(model_name, {})}
+
+
+def estimate_tokens(text, model_name=MODEL_NAME):
+    if not text:
+        return 0
+    calibration = _calibration(model_name)
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    other_chars = len(text) - ascii_chars
+    return math.ceil(
+        ascii_chars / calibration['chars_per_token']
+        + other_chars / calibration['non_ascii_chars_per_token']
+    )
+
+
+def truncate_to_tokens(text, max_tokens, model_name=MODEL_NAME):
+    """Cut text to roughly max_tokens, preferring to stop at a whitespace boundary."""
+    tokens = estimate_tokens(text, model_name)
+    if tokens <= max_tokens:
+        return text
+    end = int(len(text) * max_tokens / tokens)
+    while end > 0 and estimate_tokens(text[:end], model_name) > max_tokens:
+        end = int(end * 0.95)
+    boundary = text.rfind(' ', 0, end)
+    return text[:boundary if boundary > end // 2 else end].rstrip()
+
+
+def split_into_chunks(text, max_tokens, model_name=MODEL_NAME):
+    """Split text into pieces of at most ~max_tokens, on paragraph boundaries where possible."""
+    chunks, current, current_tokens = [], [], 0
+    for paragraph in text.split('\n\n'):
+        paragraph_tokens = estimate_tokens(paragraph, model_name)
+        while paragraph_tokens > max_tokens:
+            # a single paragraph too long for one chunk gets cut on word boundaries
+            head = truncate_to_tokens(paragraph, max_tokens, model_name)
+            chunks.append(head)
+            paragraph = paragraph[len(head):].lstrip()
+            paragraph_tokens = estimate_tokens(paragraph, model_name)
+        if current and current_tokens + paragraph_tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+        if paragraph:
+            current.append(paragraph)
+            current_tokens += paragraph_tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+def plan_generation(note_content, note_tokens, params, model_name=MODEL_NAME):
+    """
+    Decide how to send a note to the model.
+
+    'direct' sends it in one call, 'truncate' cuts it to fit one call and
+    'chunk' generates from each piece separately. 'auto' picks direct if it
+    fits, chunk if the whole note fits the per-request budget, else truncate.
+    Raises TokenBudgetExceeded if the requested strategy cannot be honoured.
+    """
+    overhead = estimate_tokens(build_prompt('', params['content_type'], params), model_name)
+    max_note_tokens = max(settings.GENERATION_MAX_INPUT_TOKENS - overhead, 1)
+    request_budget = settings.GENERATION_REQUEST_TOKEN_BUDGET
+    strategy = params.get('strategy', 'auto')
+
+    if note_tokens <= max_note_tokens and strategy in ('auto', 'direct', 'chunk'):
+        return GenerationPlan('direct', [note_content], overhead + note_tokens)
+
+    if strategy == 'direct':
+        raise TokenBudgetExceeded(
+            f"Note is about {note_tokens} tokens; a single request allows {max_note_tokens}. "
+            f"Use the 'chunk' or 'truncate' strategy."
+        )
+
+    if strategy in ('auto', 'chunk'):
+        pieces = split_into_chunks(note_content, max_note_tokens, model_name)
+        input_tokens = len(pieces) * overhead + note_tokens
+        if input_tokens <= request_budget:
+            return GenerationPlan('chunk', pieces, input_tokens)
+        if strategy == 'chunk':
+            raise TokenBudgetExceeded(
+                f"Note is about {note_tokens} tokens; the per-request budget is {request_budget}. "
+                f"Use the 'truncate' strategy."
+            )
+
+    truncated = truncate_to_tokens(note_content, max_note_tokens, model_name)
+    return GenerationPlan('truncate', [truncated], overhead + estimate_tokens(truncated, model_name))
@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+
+
+def session_file_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{session.id.hex}.part")
+
+
+def chain_checksum(previous, chunk_digest):
+    """
+    Fold one chunk into the session's running checksum.
+
+    checksum_n = sha256(bytes.fromhex(checksum_{n-1}) + sha256(chunk_n)), starting
+    from an empty checksum. Unlike a plain sha256 of the file, this can be stored
+    between requests, so clients can compute the same value while uploading.
+    """
+    return hashlib.sha256(bytes.fromhex(previous) + chunk_digest).hexdigest()
+
+
+def append_chunk(session, chunk):
+    """
+    Write an uploaded chunk to the end of the session's part file.
+
+    Anything past session.received_bytes is left over from an interrupted request
+    and gets truncated first. Returns the sha256 digest of the chunk.
+    """
+    path = session_file_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    hasher = hashlib.sha256()
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as fh:
+        fh.seek(session.received_bytes)
+        fh.truncate()
+        for piece in chunk.chunks():
+            fh.write(piece)
+            hasher.update(piece)
+    return hasher.digest()
+
+
+def rollback_chunk(session):
+    """Drop bytes written past the last accepted chunk."""
+    path = session_file_path(session)
+    if os.path.exists(path):
+        with open(path, 'r+b') as fh:
+            fh.truncate(session.received_bytes)
+
+
+def discard_session_file(session):
+    try:
+        os.remove(session_file_path(session))
+    except FileNotFoundError:
+        pass
+
+
+class AssembledFile(File):
+    """
+    Wraps a finished part file so FileSystemStorage moves it into place
+    instead of copying it chunk by chunk.
+    """
+    def __init__(self, file, path, name=None):
+        super().__init__(file, name)
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
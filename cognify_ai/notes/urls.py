@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserNoteViewSet, GeneratedContentViewSet, UserFeedbackViewSet, TestAIGenerationView
+from .views import UserNoteViewSet, GeneratedContentViewSet, UserFeedbackViewSet, TestAIGenerationView, UploadSessionViewSet, StudyCardViewSet
 
 router = DefaultRouter()
 router.register(r'notes', UserNoteViewSet, basename='note')
 router.register(r'generated-contents', GeneratedContentViewSet, basename='generated-content')
 router.register(r'feedbacks', UserFeedbackViewSet, basename='feedback')
+router.register(r'study-cards', StudyCardViewSet, basename='study-card')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,22 +1,61 @@
 from rest_framework.views import APIView
-from rest_framework import viewsets, status, permissions, serializers
+from rest_framework import viewsets, mixins, status, permissions, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import UserNote, GeneratedContent, UserFeedback
+from .models import UserNote, GeneratedContent, UserFeedback, UploadSession, StudyCard
 from .serializers import (
     UserNoteSerializer,
     GeneratedContentSerializer,
     UserFeedbackSerializer,
-    GenerateContentRequestSerializer
+    GenerateContentRequestSerializer,
+    ExportFilterSerializer,
+    UploadSessionSerializer,
+    UploadChunkSerializer,
+    FinalizeUploadSerializer,
+    StudyCardSerializer,
+    DueCardsQuerySerializer,
+    ReviewBatchSerializer
 )
+from .generation import (
+    build_prompt,
+    build_translation_prompt,
+    generate_text,
+    merge_chunk_results,
+    structure_ai_response,
+    translation_matches
+)
+from .providers import get_provider
+from .cleanup import schedule_purge
+from .study import schedule_review
+from .throttling import (
+    PayloadTooLarge,
+    TestAIFingerprintThrottle,
+    TestAIIPThrottle,
+    request_fingerprint,
+    test_ai_pool
+)
+from .tokens import GenerationPlan, TokenBudgetExceeded, estimate_tokens, plan_generation
+from .exports import EXPORT_FORMATS
+from .uploads import (
+    AssembledFile,
+    append_chunk,
+    chain_checksum,
+    discard_session_file,
+    rollback_chunk,
+    session_file_path
+)
+from django.core.files.move import file_move_safe
+from django.db import transaction
+from django.db.models import F, Sum
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 # import openai
-import google.generativeai as genai
 from django.conf import settings
 import json
+import os
 import logging
-import fitz
 import re
 
 import re
@@ -27,13 +66,38 @@ from django.utils.timezone import now, timedelta
 
 logger = logging.getLogger(__name__)
 
+
+def extract_text_from_pdf(source):
+    """Extract text from a PDF given a filesystem path or an uploaded file."""
+    fitz = get_provider('pdf')
+    if isinstance(source, str):
+        doc = fitz.open(source)
+    elif hasattr(source, "temporary_file_path"):
+        # large uploads are already on disk, let PyMuPDF read them from there
+        doc = fitz.open(source.temporary_file_path())
+    else:
+        source.seek(0)
+        doc = fitz.open(stream=source.read(), filetype="pdf")
+        source.seek(0)
+    text = ""
+    for page in doc:
+        text += page.get_text()
+    doc.close()
+    return text.strip()
+
 class UserNoteViewSet(viewsets.ModelViewSet):
     queryset = UserNote.objects.all()
     serializer_class = UserNoteSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user, deleted_at__isnull=True)
+
+    def perform_destroy(self, instance):
+        # generated content, feedback and the uploaded file are removed in the background
+        instance.deleted_at = now()
+        instance.save(update_fields=['deleted_at'])
+        transaction.on_commit(schedule_purge)
 
     # def scan_file_for_viruses(self, uploaded_file):
     #     cd = pyclamd.ClamdAgnostic()
@@ -63,29 +127,28 @@ class UserNoteViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user, content=content)
 
     def _extract_text_from_pdf(self, uploaded_file):
-        text = ""
-        doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        return text.strip()
+        return extract_text_from_pdf(uploaded_file)
 
     def has_reached_daily_limit(self,user):
-        today = now().date()
-        return GeneratedContent.objects.filter(
-            note__user=user,
-            created_at__date=today
-        ).count() >= settings.MAX_DAILY_GENERATIONS
+        return GeneratedContent.objects.charged_today(user).count() >= settings.MAX_DAILY_GENERATIONS
+
+    def tokens_used_today(self, user):
+        return GeneratedContent.objects.charged_today(user).aggregate(
+            total=Sum(F('input_tokens') + F('output_tokens'))
+        )['total'] or 0
 
     @action(detail=False, methods=['get'])
     def quota_status(self, request):
-        today = now().date()
-        used = GeneratedContent.objects.filter(note__user=request.user, created_at__date=today).count()
+        used = GeneratedContent.objects.charged_today(request.user).count()
         remaining = max(settings.MAX_DAILY_GENERATIONS - used, 0)
+        tokens_used = self.tokens_used_today(request.user)
         return Response({
             "used": used,
             "remaining": remaining,
-            "limit": settings.MAX_DAILY_GENERATIONS
+            "limit": settings.MAX_DAILY_GENERATIONS,
+            "tokens_used": tokens_used,
+            "tokens_remaining": max(settings.GENERATION_DAILY_TOKEN_BUDGET - tokens_used, 0),
+            "token_limit": settings.GENERATION_DAILY_TOKEN_BUDGET
         })
 
     @action(detail=True, methods=['post'], serializer_class=GenerateContentRequestSerializer)
@@ -100,9 +163,42 @@ class UserNoteViewSet(viewsets.ModelViewSet):
 
         serializer = GenerateContentRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
 
+        # the plan from the note is also the fallback for a failed translation,
+        # so its size limits apply whether or not a translation is attempted
         try:
-            generated_content = self._generate_ai_content(note, serializer.validated_data)
+            plan = self._plan_generation(note, params)
+        except TokenBudgetExceeded as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        tokens_remaining = settings.GENERATION_DAILY_TOKEN_BUDGET - self.tokens_used_today(request.user)
+        if plan.input_tokens > tokens_remaining:
+            return Response(
+                {"error": "Daily token budget reached. Try a shorter note or try again tomorrow."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        source = self._find_translation_source(note, params) if params['reuse_translation'] else None
+        translation_plan = self._plan_translation(source, params) if source else None
+        # only translate if the fallback would still fit the budget after a failed translation
+        if translation_plan and translation_plan.input_tokens + plan.input_tokens > tokens_remaining:
+            translation_plan = None
+
+        try:
+            spent = (0, 0)
+            if translation_plan:
+                structured_content, output_tokens = self._translate_ai_content(params, translation_plan, source)
+                if structured_content is not None:
+                    generated_content = self._save_generated_content(
+                        note, params, translation_plan, structured_content,
+                        translation_plan.input_tokens, output_tokens, source=source
+                    )
+                    return Response(generated_content, status=status.HTTP_201_CREATED)
+                # the translation came back malformed, generate from the note after all;
+                # the discarded call is charged to the row that gets stored
+                spent = (translation_plan.input_tokens, output_tokens)
+            generated_content = self._generate_ai_content(note, params, plan, spent)
             return Response(generated_content, status=status.HTTP_201_CREATED)
         except Exception as e:
             logger.error(f"Error generating content: {str(e)}")
@@ -111,163 +207,116 @@ class UserNoteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def _generate_ai_content(self, note, params):
-        content_type = params['content_type']
-        prompt = self._build_prompt(note.content, content_type, params)
-
-        # Configure Gemini with your API key
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        for model in genai.list_models():
-            print(model.name)
-
-        model = genai.GenerativeModel(model_name="models/gemini-1.5-flash")
+    def _plan_generation(self, note, params):
+        # notes saved before token counts existed are counted on first use
+        if note.content and not note.token_count:
+            note.token_count = estimate_tokens(note.content)
+            UserNote.objects.filter(pk=note.pk).update(token_count=note.token_count)
+        return plan_generation(note.content, note.token_count, params)
+
+    def _find_translation_source(self, note, params):
+        """An original generation of the same kind for this note, in any other language."""
+        candidates = note.generated_contents.filter(
+            content_type=params['content_type'],
+            source__isnull=True,
+            generation_parameters__complexity=params['complexity'],
+            generation_parameters__language__isnull=False
+        ).exclude(generation_parameters__language__iexact=params['language'])
+        if params['content_type'] == 'summary':
+            candidates = candidates.filter(generation_parameters__length=params['length'])
+        return candidates.order_by('-created_at').first()
+
+    def _plan_translation(self, source, params):
+        prompt = build_translation_prompt(
+            source.content, params['content_type'], source.generation_parameters['language'], params['language']
+        )
+        input_tokens = estimate_tokens(prompt)
+        if input_tokens > settings.GENERATION_MAX_INPUT_TOKENS:
+            return None
+        return GenerationPlan('translate', [prompt], input_tokens)
 
+    def _translate_ai_content(self, params, plan, source):
+        """Returns the translated content, or None if it did not match the source, and its output tokens."""
+        content_type = params['content_type']
         try:
-            response = model.generate_content(prompt)
-            ai_response = response.text  # Get raw string response
+            ai_response = generate_text(get_provider('genai'), plan.pieces[0])
         except Exception as e:
             logger.exception("Gemini API call failed")
             raise e
+        output_tokens = estimate_tokens(ai_response)
 
-        # Structure AI response
-        structured_content = self._structure_ai_response(ai_response, content_type)
+        structured_content = structure_ai_response(ai_response, content_type)
+        if not translation_matches(source.content, structured_content, content_type):
+            logger.warning(f"Translation of generated content {source.id} did not match its source.")
+            return None, output_tokens
+        return structured_content, output_tokens
 
-        # Save to DB
+    def _save_generated_content(self, note, params, plan, structured_content, input_tokens, output_tokens, source=None):
         generated_content = GeneratedContent.objects.create(
             note=note,
-            content_type=content_type,
+            content_type=params['content_type'],
             content=structured_content,
-            generation_parameters=params
+            generation_parameters={**params, 'strategy': plan.strategy},
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            source=source
         )
-
         return GeneratedContentSerializer(generated_content, context={'request': self.request}).data
 
-    def _build_prompt(self, note_content, content_type, params):
-        complexity = params['complexity']
-        language = params['language']
-        length = params.get('length', 'medium')
-
-        if content_type == 'flashcards':
-            return (
-                # f"You are a helpful assistant. Generate flashcards from this note. "
-                # f"Complexity: {complexity}. Language: {language}. "
-                # f"Return as JSON: [{{'question': '...', 'answer': '...'}}].\n\n{note_content}"
-                f"Create flashcards from the following text. "
-                f"Each flashcard should be returned as a JSON object with 'question' and 'answer'. "
-                f"Only return a valid JSON array. Do not include extra text.\n\n"
-                f"Complexity: {complexity}. Language: {language}.\n\n{note_content}"
+    def _generate_ai_content(self, note, params, plan, spent=(0, 0)):
+        content_type = params['content_type']
+        results, output_tokens = [], 0
 
-            )
-        elif content_type == 'summary':
-            return (
-                f"Summarize the following text into a {length} summary. "
-                f"Complexity: {complexity}. Language: {language}. "
-                f"Return as JSON: {{'summary': '...'}}.\n\n{note_content}"
-            )
-        elif content_type == 'quiz_questions':
-            return (
-                # f"Generate quiz questions from this content. Complexity: {complexity}. Language: {language}. "
-                # f"Each question must have 4 multiple-choice answers and the correct answer marked. "
-                # f"Return as JSON: [{{'question': '...', 'options': [...], 'correct_answer': '...'}}].\n\n{note_content}"
-                f"Generate multiple-choice quiz questions from the following text. "
-                f"Each question must be a JSON object with:\n"
-                f"- 'question': the question string\n"
-                f"- 'options': an array of 4 choices\n"
-                f"- 'answer': the correct answer (must match one of the options)\n\n"
-                f"Return a valid JSON array like this:\n"
-                f"[{{\"question\": \"...\", \"options\": [\"...\", \"...\", \"...\", \"...\"], \"answer\": \"...\"}}, ...]\n"
-                f"No explanation. JSON only.\n\n"
-                f"Complexity: {complexity}. Language: {language}.\n\n{note_content}"
-            )
-        return note_content
+        for piece in plan.pieces:
+            prompt = build_prompt(piece, content_type, params)
+            try:
+                # Gemini is configured with your API key on first use
+                ai_response = generate_text(get_provider('genai'), prompt)
+            except Exception as e:
+                logger.exception("Gemini API call failed")
+                raise e
+            output_tokens += estimate_tokens(ai_response)
 
-    def _structure_ai_response(self, ai_response, content_type):
-        """Convert AI response to structured JSON"""
-        try:
-            # Try to parse as JSON directly
-            return json.loads(ai_response)
-        except json.JSONDecodeError:
-            # If not valid JSON, handle based on content type
-            
-            if content_type == 'summary':
-                return {'summary': ai_response}
-            
-            
-            
-            elif content_type == 'flashcards':
-                # Try to parse flashcard format if not JSON
-                flashcards = []
-                lines = ai_response.strip().split('\n')
-                question, answer = None, None
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
+            # Structure AI response
+            results.append(structure_ai_response(ai_response, content_type))
 
-                    if '?' in line and not line.lower().startswith("a:"):
-                        if question and answer:
-                            flashcards.append({
-                                "question": question.strip(),
-                                "answer": answer.strip()
-                            })
-                        question = line
-                        answer = ""
-                    elif question:
-                        if line.lower().startswith("a:"):
-                            answer = line[2:].strip()
-                        else:
-                            answer += " " + line.strip()
+        structured_content = results[0] if len(results) == 1 else merge_chunk_results(results, content_type)
 
-                if question and answer:
-                    flashcards.append({
-                        "question": question.strip(),
-                        "answer": answer.strip()
-                    })
-                return flashcards
-            
-            elif content_type == 'quiz_questions':
-                 # Try to extract a valid JSON array from the text using regex
-                try:
-                    # Extract the first JSON array in the response
-                    match = re.search(r'\[\s*\{.*?\}\s*\]', ai_response, re.DOTALL)
-                    if match:
-                        json_str = match.group(0)
-                        return json.loads(json_str)
-                except Exception:
-                    pass
-
-                # Fallback to custom parsing
-                quiz_items = []
-                lines = ai_response.strip().split('\n')
-                question, options, correct_answer = "", [], ""
-
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    if '?' in line and not options:
-                        question = line
-                        options = []
-                    elif re.match(r"^[-\d\.\)]\s*", line):  # e.g., "- Option", "1. Option", "a) Option"
-                        option_text = re.sub(r"^[-\d\.\)]\s*", '', line).strip()
-                        options.append(option_text)
-                    elif line.lower().startswith("answer:"):
-                        correct_answer = line.split(":", 1)[1].strip()
-                        if question and options and correct_answer:
-                            quiz_items.append({
-                                "question": question,
-                                "options": options,
-                                "answer": correct_answer
-                            })
-                            question, options, correct_answer = "", [], ""
-                return quiz_items
+        # Save to DB
+        return self._save_generated_content(
+            note, params, plan, structured_content,
+            plan.input_tokens + spent[0], output_tokens + spent[1]
+        )
 
 class GeneratedContentViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = GeneratedContentSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return GeneratedContent.objects.filter(note__user=self.request.user)
+        return GeneratedContent.objects.filter(note__user=self.request.user, note__deleted_at__isnull=True)
+
+    @action(detail=False, methods=['get'], url_path=r'export/(?P<export_format>csv|jsonl|anki)')
+    def export(self, request, export_format=None):
+        """
+        Stream all of the user's generated content as CSV, JSONL or an Anki deck.
+        Optional filters: ?note=<id>&note=<id>&content_type=<type>.
+        """
+        filters = ExportFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+
+        queryset = self.get_queryset()
+        if filters.validated_data.get('note'):
+            queryset = queryset.filter(note_id__in=filters.validated_data['note'])
+        if filters.validated_data.get('content_type'):
+            queryset = queryset.filter(content_type__in=filters.validated_data['content_type'])
+
+        render, content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            render(queryset, settings.EXPORT_CHUNK_SIZE),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="cognify-export.{extension}"'
+        return response
 
 class UserFeedbackViewSet(viewsets.ModelViewSet):
     serializer_class = UserFeedbackSerializer
@@ -275,21 +324,209 @@ class UserFeedbackViewSet(viewsets.ModelViewSet):
     queryset = UserFeedback.objects.all()
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user, generated_content__note__deleted_at__isnull=True)
 
     def perform_create(self, serializer):
         generated_content = get_object_or_404(
             GeneratedContent,
             id=serializer.validated_data['generated_content'].id,
-            note__user=self.request.user
+            note__user=self.request.user,
+            note__deleted_at__isnull=True
         )
         serializer.save(user=self.request.user, generated_content=generated_content)
-        
+
+
+class StudyCardViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = StudyCardSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return StudyCard.objects.filter(
+            user=self.request.user,
+            generated_content__note__deleted_at__isnull=True
+        ).select_related('generated_content')
+
+    @action(detail=False, methods=['get'])
+    def due(self, request):
+        query = DueCardsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        # served by the (user, due_at) index
+        cards = self.get_queryset().filter(due_at__lte=now()).order_by('due_at')[:query.validated_data['limit']]
+        return Response(StudyCardSerializer(cards, many=True).data)
+
+    @action(detail=False, methods=['post'], serializer_class=ReviewBatchSerializer)
+    def review(self, request):
+        serializer = ReviewBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reviews = serializer.validated_data['reviews']
+        reviewed_at = now()
+
+        with transaction.atomic():
+            cards = self.get_queryset().select_for_update(of=('self',)).filter(
+                id__in={review['card'] for review in reviews}
+            ).in_bulk()
+            missing = sorted({review['card'] for review in reviews} - cards.keys())
+            if missing:
+                return Response(
+                    {"error": "Unknown cards.", "cards": missing},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            for review in reviews:
+                schedule_review(cards[review['card']], review['grade'], reviewed_at)
+            StudyCard.objects.bulk_update(
+                cards.values(),
+                ['due_at', 'interval_days', 'ease_factor', 'repetitions', 'lapses', 'last_reviewed_at']
+            )
+
+        return Response(StudyCardSerializer(cards.values(), many=True).data)
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads.
+
+    Create a session with the file's total size, send chunks in order with
+    `chunk`, then `finalize` to turn the assembled file into a UserNote.
+    After an interruption, GET the session and continue from `next_chunk`.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_session_file(instance)
+        instance.delete()
+
+    def _locked_session(self, pk):
+        return get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+
+    @action(detail=True, methods=['post'], serializer_class=UploadChunkSerializer)
+    def chunk(self, request, pk=None):
+        serializer = UploadChunkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        index = serializer.validated_data['index']
+        chunk = serializer.validated_data['chunk']
+
+        with transaction.atomic():
+            session = self._locked_session(pk)
+
+            if session.note_id:
+                return Response({"error": "Upload is already finalized."}, status=status.HTTP_400_BAD_REQUEST)
+            if index < session.next_chunk:
+                # retry of a chunk we already stored, e.g. the response got lost
+                return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+            if index > session.next_chunk:
+                return Response(
+                    {"error": "Chunks must be sent in order.", "next_chunk": session.next_chunk},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if session.received_bytes + chunk.size > session.total_size:
+                return Response(
+                    {"error": "Chunk exceeds the declared file size."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            digest = append_chunk(session, chunk)
+            expected = serializer.validated_data.get('checksum')
+            if expected and expected.lower() != digest.hex():
+                rollback_chunk(session)
+                return Response(
+                    {"error": "Chunk checksum mismatch.", "next_chunk": session.next_chunk},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            session.received_bytes += chunk.size
+            session.next_chunk += 1
+            session.checksum = chain_checksum(session.checksum, digest)
+            session.save(update_fields=['received_bytes', 'next_chunk', 'checksum', 'updated_at'])
+
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], serializer_class=FinalizeUploadSerializer)
+    def finalize(self, request, pk=None):
+        serializer = FinalizeUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        placed = None
+        try:
+            with transaction.atomic():
+                session = self._locked_session(pk)
+
+                if session.note_id:
+                    # finalize was retried after the note had been created
+                    return Response(
+                        UserNoteSerializer(session.note, context={'request': request}).data,
+                        status=status.HTTP_200_OK
+                    )
+                if not session.is_complete:
+                    return Response(
+                        {"error": "Upload is incomplete.", "next_chunk": session.next_chunk},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                expected = serializer.validated_data.get('checksum')
+                if expected and expected.lower() != session.checksum:
+                    return Response({"error": "Checksum mismatch."}, status=status.HTTP_400_BAD_REQUEST)
+
+                path = session_file_path(session)
+                content = session.content.strip()
+                if session.filename.endswith(".pdf"):
+                    try:
+                        content = content or extract_text_from_pdf(path)
+                    except Exception:
+                        logger.exception("PDF extraction failed.")
+                        raise serializers.ValidationError("Could not extract text from the PDF.")
+
+                note = UserNote(user=request.user, title=session.title, content=content)
+                with open(path, 'rb') as fh:
+                    # moves the part file into user_notes/ rather than copying it
+                    note.file.save(session.filename, AssembledFile(fh, path), save=False)
+                placed = note.file.path
+                # the move keeps the last chunk's mtime; reconcile_media's grace period should start now
+                os.utime(placed)
+                note.save()
+
+                session.note = note
+                session.save(update_fields=['note', 'updated_at'])
+        except Exception:
+            if placed:
+                # the rows were rolled back; put the part file back so finalize can be retried
+                file_move_safe(placed, path, allow_overwrite=True)
+            raise
+
+        return Response(
+            UserNoteSerializer(note, context={'request': request}).data,
+            status=status.HTTP_201_CREATED
+        )
+
 
 class TestAIGenerationView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TestAIIPThrottle]
+
+    def initial(self, request, *args, **kwargs):
+        # reject oversized bodies before the throttles or the view parse them
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        if content_length > settings.TEST_AI_MAX_BODY_BYTES:
+            raise PayloadTooLarge()
+        super().initial(request, *args, **kwargs)
 
     def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                {"error": "Missing or invalid parameters. 'text' and valid 'mode' required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         text = request.data.get("text")
         mode = request.data.get("mode")  # "summary", "flashcards", or "quiz"
         complexity = request.data.get("complexity", "medium")
@@ -300,14 +537,36 @@ class TestAIGenerationView(APIView):
                 {"error": "Missing or invalid parameters. 'text' and valid 'mode' required."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if len(str(text)) > settings.TEST_AI_MAX_TEXT_CHARS:
+            return Response(
+                {"error": f"'text' must be at most {settings.TEST_AI_MAX_TEXT_CHARS} characters."},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
 
-        # Configure Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel("gemini-2.0-flash")
+        # identical inputs get the same answer without another model call
+        fingerprint = request_fingerprint(request.data)
+        cache_key = f"test-ai:response:{fingerprint}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached, status=status.HTTP_200_OK)
 
-        prompt = self._build_prompt(text, mode, complexity, language)
+        # only misses reach the model, so only they count toward the per-input limit
+        throttle = TestAIFingerprintThrottle(fingerprint)
+        if not throttle.allow_request(request, self):
+            self.throttled(request, throttle.wait())
+
+        if not test_ai_pool.acquire():
+            return Response(
+                {"error": "The demo is busy. Please try again shortly."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "5"}
+            )
 
         try:
+            genai = get_provider('genai')
+            model = genai.GenerativeModel("gemini-2.0-flash")
+
+            prompt = self._build_prompt(text, mode, complexity, language)
             response = model.generate_content(prompt)
             ai_response = response.text
 
@@ -317,10 +576,13 @@ class TestAIGenerationView(APIView):
             print("=====================")
 
             structured = self._structure_ai_response(ai_response, mode)
+            cache.set(cache_key, structured, settings.TEST_AI_RESPONSE_CACHE_SECONDS)
             return Response(structured, status=status.HTTP_200_OK)
         except Exception as e:
             logger.exception("Gemini generation failed.")
             return Response({"error": "AI generation failed."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            test_ai_pool.release()
 
     def _build_prompt(self, text, mode, complexity, language):
         if mode == "summary":